@@ -1,8 +1,13 @@
+import hashlib
 import heapq
 import math
 import random
+import struct
+import threading
+from array import array
+from functools import partial
 from queue import deque
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from typing import List, Tuple, Optional, Union, Dict, Set, Any
 
 class Node:
@@ -407,6 +412,145 @@ def bidirectional_search_with_animation(luoi: Grid, diemBatDau: Node, diemKetThu
 
     yield [], cacNutDaTham
 
+def _bfs_toi_gan_nhat(luoi: Grid, tu: Node, cacDich: Set[Node]) -> Optional[List[Node]]:
+    """Shortest path from tu to the nearest cell of cacDich, None if none is reachable"""
+    tuDauDen = {tu: None}
+    hangDoi = deque([tu])
+    while hangDoi:
+        nut = hangDoi.popleft()
+        if nut in cacDich:
+            duongDi = []
+            while nut is not None:
+                duongDi.append(nut)
+                nut = tuDauDen[nut]
+            return duongDi[::-1]
+        for nutLangGieng, _ in luoi.layLangGieng(nut, baoGomCheo=False):
+            if nutLangGieng not in tuDauDen:
+                tuDauDen[nutLangGieng] = nut
+                hangDoi.append(nutLangGieng)
+    return None
+
+def pareto_coin_search_with_animation(luoi: Grid, diemBatDau: Node, diemKetThuc: Node, coins: Set[Node],
+                                      soNhanToiDa: int = 8, soBuocToiDa: int = 100000):
+    """
+    One multi-objective label-setting search from start to goal. Each cell keeps at most
+    soNhanToiDa Pareto-optimal labels (coins collected, path length), popped in order of
+    length, and the goal label with the best coins * 1000 - length score is returned.
+    A label only dominates another if it holds every coin the other holds, so revisiting
+    a coin never counts twice. A greedy nearest-coin walk gives the first best score, and
+    labels whose score bound cannot beat the best are dropped; after soBuocToiDa
+    expansions the best path found so far is returned.
+    """
+    cacNutDaTham = []
+    # Only coins in the start's component can ever be collected
+    lanCan = set()
+    hangDoi = deque([diemBatDau]) if luoi.hopLe(diemBatDau) else deque()
+    lanCan.update(hangDoi)
+    while hangDoi:
+        for nutLangGieng, _ in luoi.layLangGieng(hangDoi.popleft(), baoGomCheo=False):
+            if nutLangGieng not in lanCan:
+                lanCan.add(nutLangGieng)
+                hangDoi.append(nutLangGieng)
+    if diemKetThuc not in lanCan:
+        yield [], cacNutDaTham
+        return
+    coins = {coin for coin in coins if coin in lanCan}
+
+    # Greedy walk: nearest remaining coin until none is left, then the goal
+    duongThamLam = [diemBatDau]
+    conLai = coins - {diemBatDau}
+    while conLai:
+        doan = _bfs_toi_gan_nhat(luoi, duongThamLam[-1], conLai)
+        duongThamLam.extend(doan[1:])
+        conLai -= set(doan)
+    duongThamLam.extend(_bfs_toi_gan_nhat(luoi, duongThamLam[-1], {diemKetThuc})[1:])
+    diemThamLam = len(coins.intersection(duongThamLam)) * 1000 - len(duongThamLam)
+
+    chiSoCoin = {coin: i for i, coin in enumerate(coins)}
+    cacNhan = []  # (nut, length, coinMask, soCoin, parent label index, score bound)
+    nhanTheoNut = defaultdict(list)  # Node -> [(coinMask, soCoin, length)] of kept labels
+    daTham = set()
+
+    def khoangCach(a: Node, b: Node) -> int:
+        return abs(a.hang - b.hang) + abs(a.cot - b.cot)
+
+    def canTren(nut: Node, doDai: int, mask: int, soCoin: int) -> int:
+        """
+        Upper bound on the final score of a label: taking j more coins costs at least the
+        j-th smallest detour (to a missing coin, then to the goal) on top of the length
+        """
+        denDich = khoangCach(nut, diemKetThuc)
+        vongQua = sorted(khoangCach(nut, coin) + khoangCach(coin, diemKetThuc)
+                         for coin, i in chiSoCoin.items() if not mask >> i & 1)
+        tot = soCoin * 1000 - doDai - denDich
+        for j, d in enumerate(vongQua, 1):
+            tot = max(tot, (soCoin + j) * 1000 - doDai - max(d, denDich))
+        return tot
+
+    def conHyVong(tot: int) -> bool:
+        # The greedy score may be matched by a label; a label's own score must be beaten
+        return tot >= diemThamLam and tot > diemTotNhat
+
+    def themNhan(nut: Node, doDai: int, mask: int, cha: Optional[int]) -> bool:
+        soCoin = bin(mask).count("1")
+        nhan = nhanTheoNut[nut]
+        if any(m | mask == m and d <= doDai for m, _, d in nhan):
+            return False
+        tot = canTren(nut, doDai, mask, soCoin)
+        if not conHyVong(tot):
+            return False
+        nhan[:] = [(m, c, d) for m, c, d in nhan if not (m | mask == mask and doDai <= d)]
+        if len(nhan) >= soNhanToiDa:
+            # Keep the labels holding the most coins
+            nhan.sort(key=lambda x: (-x[1], x[2]))
+            if (soCoin, -doDai) <= (nhan[-1][1], -nhan[-1][2]):
+                return False
+            nhan.pop()
+        nhan.append((mask, soCoin, doDai))
+        cacNhan.append((nut, doDai, mask, soCoin, cha, tot))
+        heapq.heappush(hangDoi, (doDai, -soCoin, len(cacNhan) - 1))
+        return True
+
+    hangDoi = []
+    tongCoin = len(chiSoCoin)
+    nhanTotNhat = None
+    diemTotNhat = -math.inf
+    themNhan(diemBatDau, 1, 1 << chiSoCoin[diemBatDau] if diemBatDau in chiSoCoin else 0, None)
+
+    soBuoc = 0
+    while hangDoi and soBuoc < soBuocToiDa:
+        doDai, _, chiSo = heapq.heappop(hangDoi)
+        if tongCoin * 1000 - doDai <= diemTotNhat:
+            break  # No longer label can beat the best score even with every coin
+        nut, doDai, mask, soCoin, _, tot = cacNhan[chiSo]
+        if (mask, soCoin, doDai) not in nhanTheoNut[nut] or not conHyVong(tot):
+            continue  # Pruned by a better label or a better score after it was queued
+        soBuoc += 1
+        if nut not in daTham:
+            daTham.add(nut)
+            score = 100 if nut == diemKetThuc else (3 if nut in coins else -1)
+            cacNutDaTham.append((nut.hang, nut.cot, score))
+        # Keep expanding past the goal: coins beyond it can still pay for the way back
+        if nut == diemKetThuc and soCoin * 1000 - doDai > diemTotNhat:
+            diemTotNhat = soCoin * 1000 - doDai
+            nhanTotNhat = chiSo
+
+        for nutLangGieng, _ in luoi.layLangGieng(nut, baoGomCheo=False):
+            maskMoi = mask | (1 << chiSoCoin[nutLangGieng]) if nutLangGieng in chiSoCoin else mask
+            themNhan(nutLangGieng, doDai + 1, maskMoi, chiSo)
+        yield [], cacNutDaTham
+
+    if nhanTotNhat is None or diemTotNhat < diemThamLam:
+        yield duongThamLam, cacNutDaTham
+        return
+    duongDi = []
+    chiSo = nhanTotNhat
+    while chiSo is not None:
+        duongDi.append(cacNhan[chiSo][0])
+        chiSo = cacNhan[chiSo][4]
+    duongDi.reverse()
+    yield duongDi, cacNutDaTham
+
 def find_highest_score_path(grid: Grid, start: Node, goal: Node, coins: Set[Node], visited_nodes: List[Tuple[int, int, int]] = None) -> List[Node]:
     """
     Find the path with the highest score using A* with score-based heuristic.
@@ -467,4 +611,557 @@ def find_highest_score_path(grid: Grid, start: Node, goal: Node, coins: Set[Node
                 heapq.heappush(pq, (-(new_g_score + h_score), new_g_score, neighbor, frozenset(new_collected), new_path))
                 came_from[new_state] = (current, collected)
 
-    return []  # Không tìm được đường
\ No newline at end of file
+    return []  # Không tìm được đường
+
+class DStarLite:
+    """
+    Incremental shortest path (D* Lite) from a start cell to a fixed goal on a 4-connected Grid.
+    The search runs backwards from the goal, so after cells change only the affected
+    part of the g/rhs tables is repaired instead of searching the whole maze again.
+    """
+    def __init__(self, luoi: Grid, diemBatDau: Node, diemKetThuc: Node):
+        self.luoi = luoi
+        self.start = diemBatDau
+        self.goal = diemKetThuc
+        self.km = 0
+        self.g = {}
+        self.rhs = {diemKetThuc: 0}
+        self.open = {}  # Node -> current key; heap entries with another key are stale
+        self.heap = []
+        self.expanded = []
+        self._push(diemKetThuc)
+
+    def _h(self, a: Node, b: Node) -> int:
+        return abs(a.hang - b.hang) + abs(a.cot - b.cot)
+
+    def _key(self, nut: Node) -> Tuple[float, float]:
+        m = min(self.g.get(nut, math.inf), self.rhs.get(nut, math.inf))
+        return (m + self._h(self.start, nut) + self.km, m)
+
+    def _push(self, nut: Node):
+        key = self._key(nut)
+        self.open[nut] = key
+        heapq.heappush(self.heap, (key, nut))
+
+    def _top_key(self) -> Tuple[float, float]:
+        while self.heap and self.open.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else (math.inf, math.inf)
+
+    def _neighbors(self, nut: Node) -> List[Node]:
+        # All in-bounds neighbours, walls included: they are reachable with infinite cost
+        result = []
+        for dx, dy in self.luoi.cacHuongKhongCheo:
+            hang, cot = nut.hang + dx, nut.cot + dy
+            if 0 <= hang < self.luoi.soHang and 0 <= cot < self.luoi.soCot:
+                result.append(Node(hang, cot))
+        return result
+
+    def _cost(self, a: Node, b: Node) -> float:
+        return 1 if self.luoi.hopLe(a) and self.luoi.hopLe(b) else math.inf
+
+    def _update_vertex(self, nut: Node):
+        if nut != self.goal:
+            self.rhs[nut] = min(
+                (self._cost(nut, s) + self.g.get(s, math.inf) for s in self._neighbors(nut)),
+                default=math.inf
+            )
+        self.open.pop(nut, None)
+        if self.g.get(nut, math.inf) != self.rhs.get(nut, math.inf):
+            self._push(nut)
+
+    def compute_shortest_path(self):
+        self.expanded = []
+        while (self._top_key() < self._key(self.start)
+               or self.rhs.get(self.start, math.inf) != self.g.get(self.start, math.inf)):
+            if not self.heap:
+                break
+            k_old, u = heapq.heappop(self.heap)
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u)
+                continue
+            del self.open[u]
+            self.expanded.append(u)
+            if self.g.get(u, math.inf) > self.rhs.get(u, math.inf):
+                self.g[u] = self.rhs[u]
+                for s in self._neighbors(u):
+                    self._update_vertex(s)
+            else:
+                self.g[u] = math.inf
+                for s in self._neighbors(u) + [u]:
+                    self._update_vertex(s)
+
+    def move_start(self, diemBatDau: Node):
+        self.km += self._h(self.start, diemBatDau)
+        self.start = diemBatDau
+
+    def update_cells(self, changes: List[Tuple[int, int, int]]):
+        """Apply (hang, cot, value) edits to the grid and mark the touched vertices for repair"""
+        changed = []
+        for hang, cot, value in changes:
+            if self.luoi.luoi[hang][cot] != value:
+                self.luoi.luoi[hang][cot] = value
+                changed.append(Node(hang, cot))
+        for nut in changed:
+            for s in self._neighbors(nut) + [nut]:
+                self._update_vertex(s)
+
+    def path(self) -> List[Node]:
+        if self.g.get(self.start, math.inf) == math.inf:
+            return []
+        duongDi = [self.start]
+        nut = self.start
+        for _ in range(self.luoi.soHang * self.luoi.soCot):
+            if nut == self.goal:
+                return duongDi
+            nut = min(self._neighbors(nut), key=lambda s: self._cost(nut, s) + self.g.get(s, math.inf))
+            duongDi.append(nut)
+        return []
+
+
+
+class HierarchicalGraph:
+    """
+    HPA* abstraction of a Grid: the maze is split into clusterSize x clusterSize clusters,
+    entrances between neighbouring clusters become abstract nodes, and distances between
+    the entrances of each cluster are precomputed once. The BFS parent map of every
+    entrance is kept too, so refining an abstract path only walks those maps back.
+    The graph lives in flat arrays indexed by node id: node cells grouped by cluster,
+    CSR edges, and one clusterSize^2 byte parent map per node. Cells are flat indices
+    (hang * soCot + cot) here to keep preprocessing of very large mazes cheap.
+    """
+    # Entrances at least this wide get a transition at both ends instead of one in the middle
+    LOI_VAO_RONG = 6
+    # Parent map codes: 0 unreached, i reached through cacHuongKhongCheo[i - 1], NGUON the source
+    NGUON = 5
+
+    def __init__(self, luoi: Grid, clusterSize: int = 10, cacMang: Optional[List] = None):
+        self.luoi = luoi
+        self.clusterSize = clusterSize
+        self.soCumHang = -(-luoi.soHang // clusterSize)
+        self.soCumCot = -(-luoi.soCot // clusterSize)
+        # Arrays from an earlier preprocessing (e.g. the shared maze store) are used as they are
+        self.cacMang = cacMang if cacMang is not None else self._tien_xu_ly()
+        self.nut, self.dauCum, self.dauCanh, self.dichCanh, self.chiPhiCanh, self.cha = self.cacMang
+
+    def _cum(self, o: int) -> int:
+        hang, cot = divmod(o, self.luoi.soCot)
+        return hang // self.clusterSize * self.soCumCot + cot // self.clusterSize
+
+    def _trong(self, o: int) -> bool:
+        hang, cot = divmod(o, self.luoi.soCot)
+        return self.luoi.luoi[hang][cot] == 0
+
+    def _quet_bien(self, cacCap: List[Tuple[int, int]], chuyenTiep: Dict[int, Set[int]]):
+        doan = []
+        for cap in cacCap + [None]:
+            if cap is not None and self._trong(cap[0]) and self._trong(cap[1]):
+                doan.append(cap)
+                continue
+            chon = [doan[0], doan[-1]] if len(doan) >= self.LOI_VAO_RONG else doan[len(doan) // 2:][:1]
+            for a, b in chon:
+                chuyenTiep[a].add(b)
+                chuyenTiep[b].add(a)
+            doan = []
+
+    def _tao_loi_vao(self) -> Dict[int, Set[int]]:
+        """Transitions between neighbouring clusters: cell -> cells across the border"""
+        soHang, soCot, k = self.luoi.soHang, self.luoi.soCot, self.clusterSize
+        chuyenTiep = defaultdict(set)
+        for hang in range(k, soHang, k):
+            for cot0 in range(0, soCot, k):
+                self._quet_bien([((hang - 1) * soCot + cot, hang * soCot + cot)
+                                 for cot in range(cot0, min(cot0 + k, soCot))], chuyenTiep)
+        for cot in range(k, soCot, k):
+            for hang0 in range(0, soHang, k):
+                self._quet_bien([(hang * soCot + cot - 1, hang * soCot + cot)
+                                 for hang in range(hang0, min(hang0 + k, soHang))], chuyenTiep)
+        return chuyenTiep
+
+    def _tien_xu_ly(self):
+        k = self.clusterSize
+        chuyenTiep = self._tao_loi_vao()
+        theoCum = defaultdict(list)
+        for o in chuyenTiep:
+            theoCum[self._cum(o)].append(o)
+        nut, dauCum = array("i"), array("i", [0])
+        for cum in range(self.soCumHang * self.soCumCot):
+            nut.extend(sorted(theoCum.get(cum, ())))
+            dauCum.append(len(nut))
+        chiSo = {o: i for i, o in enumerate(nut)}
+
+        cha = bytearray(len(nut) * k * k)
+        dauCanh, dichCanh, chiPhiCanh = array("i", [0]), array("i"), array("i")
+        for cum in range(len(dauCum) - 1):
+            trongCum = {nut[i]: i for i in range(dauCum[cum], dauCum[cum + 1])}
+            for o, i in trongCum.items():
+                canh = {chiSo[b]: 1 for b in chuyenTiep[o]}
+                for khac, d in self._bfs_trong_cum(o, trongCum, cha, i * k * k).items():
+                    if khac != o:
+                        canh[trongCum[khac]] = d
+                dichCanh.extend(canh)
+                chiPhiCanh.extend(canh.values())
+                dauCanh.append(len(dichCanh))
+        return nut, dauCum, dauCanh, dichCanh, chiPhiCanh, cha
+
+    def _bfs_trong_cum(self, nguon: int, dich, cha, goc: int) -> Dict[int, int]:
+        """
+        BFS from nguon restricted to its cluster, writing parent codes into cha[goc:goc + k*k];
+        returns the distance to every cell of dich it reaches
+        """
+        k, soCot = self.clusterSize, self.luoi.soCot
+        hang, cot = divmod(nguon, soCot)
+        hangMin, cotMin = hang // k * k, cot // k * k
+        hangMax, cotMax = min(hangMin + k, self.luoi.soHang), min(cotMin + k, soCot)
+        luoi = self.luoi.luoi
+        cha[goc + (hang - hangMin) * k + cot - cotMin] = self.NGUON
+        khoangCach = {nguon: 0} if nguon in dich else {}
+        hangDoi = deque([(hang, cot, 0)])
+        while hangDoi:
+            hang, cot, d = hangDoi.popleft()
+            for ma, (dx, dy) in enumerate(self.luoi.cacHuongKhongCheo, 1):
+                h, c = hang + dx, cot + dy
+                if hangMin <= h < hangMax and cotMin <= c < cotMax and luoi[h][c] == 0:
+                    viTri = goc + (h - hangMin) * k + c - cotMin
+                    if not cha[viTri]:
+                        cha[viTri] = ma
+                        hangDoi.append((h, c, d + 1))
+                        if h * soCot + c in dich:
+                            khoangCach[h * soCot + c] = d + 1
+        return khoangCach
+
+    def _duong_trong_cum(self, cha, goc: int, dich: int) -> List[int]:
+        """Cells from the source of the parent map at cha[goc:] to dich, both included"""
+        k, soCot = self.clusterSize, self.luoi.soCot
+        hang, cot = divmod(dich, soCot)
+        hangMin, cotMin = hang // k * k, cot // k * k
+        duongDi = []
+        while True:
+            duongDi.append(hang * soCot + cot)
+            ma = cha[goc + (hang - hangMin) * k + cot - cotMin]
+            if ma == self.NGUON:
+                break
+            dx, dy = self.luoi.cacHuongKhongCheo[ma - 1]
+            hang, cot = hang - dx, cot - dy
+        duongDi.reverse()
+        return duongDi
+
+    def _tim_nut(self, o: int) -> Optional[int]:
+        cum = self._cum(o)
+        for i in range(self.dauCum[cum], self.dauCum[cum + 1]):
+            if self.nut[i] == o:
+                return i
+        return None
+
+    def search_with_animation(self, diemBatDau: Node, diemKetThuc: Node, coins: Set[Node]):
+        soCot, k, soNut = self.luoi.soCot, self.clusterSize, len(self.nut)
+        cacNutDaTham = []
+        if not (self.luoi.hopLe(diemBatDau) and self.luoi.hopLe(diemKetThuc)):
+            yield [], cacNutDaTham
+            return
+
+        # Start and goal become nodes; those that are not entrances get temporary edges
+        # to the entrances of their cluster and a parent map of their own
+        oTam = {}  # Temporary node id -> cell
+        chiSo = {}  # Start and goal cells -> node id
+        for o in (diemBatDau.hang * soCot + diemBatDau.cot, diemKetThuc.hang * soCot + diemKetThuc.cot):
+            if o not in chiSo:
+                i = self._tim_nut(o)
+                if i is None:
+                    i = soNut + len(oTam)
+                    oTam[i] = o
+                chiSo[o] = i
+        batDau, ketThuc = chiSo.values() if len(chiSo) == 2 else (list(chiSo.values()) * 2)
+        canhTam = defaultdict(dict)
+        chaTam = {}
+        for i, o in oTam.items():
+            cum = self._cum(o)
+            dich = {self.nut[j]: j for j in range(self.dauCum[cum], self.dauCum[cum + 1])}
+            dich.update((oKhac, j) for oKhac, j in chiSo.items() if j != i and self._cum(oKhac) == cum)
+            chaTam[i] = bytearray(k * k)
+            for khac, d in self._bfs_trong_cum(o, dich, chaTam[i], 0).items():
+                canhTam[i][dich[khac]] = d
+                canhTam[dich[khac]][i] = d
+
+        def oCua(i):
+            return self.nut[i] if i < soNut else oTam[i]
+
+        hangKetThuc, cotKetThuc = divmod(oCua(ketThuc), soCot)
+
+        def uocLuong(i):
+            hang, cot = divmod(oCua(i), soCot)
+            return abs(hang - hangKetThuc) + abs(cot - cotKetThuc)
+
+        hangDoi = [(uocLuong(batDau), 0, batDau)]
+        diemG = {batDau: 0}
+        tuDauDen = {batDau: None}
+        daDong = set()
+        while hangDoi:
+            _, chiPhi, i = heapq.heappop(hangDoi)
+            if i in daDong:
+                continue
+            daDong.add(i)
+            hang, cot = divmod(oCua(i), soCot)
+            score = 3 if Node(hang, cot) in coins else -1
+            cacNutDaTham.append((hang, cot, 100 if i == ketThuc else score))
+            if i == ketThuc:
+                yield self._tinh_chi_tiet(tuDauDen, ketThuc, oCua, chaTam), cacNutDaTham
+                return
+            canh = canhTam.get(i, {}).items()
+            if i < soNut:
+                dau, cuoi = self.dauCanh[i], self.dauCanh[i + 1]
+                canh = list(zip(self.dichCanh[dau:cuoi], self.chiPhiCanh[dau:cuoi])) + list(canh)
+            for khac, d in canh:
+                chiPhiMoi = chiPhi + d
+                if chiPhiMoi < diemG.get(khac, math.inf):
+                    diemG[khac] = chiPhiMoi
+                    tuDauDen[khac] = i
+                    heapq.heappush(hangDoi, (chiPhiMoi + uocLuong(khac), chiPhiMoi, khac))
+            yield [], cacNutDaTham
+
+        yield [], cacNutDaTham
+
+    def _tinh_chi_tiet(self, tuDauDen: Dict, ketThuc: int, oCua, chaTam: Dict[int, bytearray]) -> List[Node]:
+        """Refine the abstract path into a cell-level path using the stored parent maps"""
+        k2 = self.clusterSize * self.clusterSize
+        cacNutTruuTuong = []
+        i = ketThuc
+        while i is not None:
+            cacNutTruuTuong.append(i)
+            i = tuDauDen[i]
+        cacNutTruuTuong.reverse()
+        duongDi = [oCua(cacNutTruuTuong[0])]
+        for a, b in zip(cacNutTruuTuong, cacNutTruuTuong[1:]):
+            if self._cum(oCua(a)) != self._cum(oCua(b)):
+                duongDi.append(oCua(b))  # Inter-cluster transition, always one step
+            elif a in chaTam:
+                duongDi.extend(self._duong_trong_cum(chaTam[a], 0, oCua(b))[1:])
+            else:
+                duongDi.extend(self._duong_trong_cum(self.cha, a * k2, oCua(b))[1:])
+        return [Node(*divmod(o, self.luoi.soCot)) for o in duongDi]
+
+
+# Packed tables: table count, then (typecode, bytes) per table, then each table padded to 8 bytes
+_DAU_GOI = struct.Struct("<i")
+_MUC_GOI = struct.Struct("<cxxxq")
+
+def pack_tables(cacMang: List) -> bytes:
+    cacPhan = [memoryview(m) for m in cacMang]
+    goi = bytearray(_DAU_GOI.pack(len(cacPhan)))
+    for m in cacPhan:
+        goi += _MUC_GOI.pack(m.format.encode(), m.nbytes)
+    for m in cacPhan:
+        goi += m.tobytes() + bytes(-m.nbytes % 8)
+    return bytes(goi)
+
+def unpack_tables(goi: memoryview) -> List[memoryview]:
+    """Zero-copy views of the tables in a pack_tables buffer"""
+    goi = memoryview(goi)
+    (soBang,) = _DAU_GOI.unpack_from(goi, 0)
+    viTri = _DAU_GOI.size + soBang * _MUC_GOI.size
+    cacMang = []
+    for i in range(soBang):
+        ma, soByte = _MUC_GOI.unpack_from(goi, _DAU_GOI.size + i * _MUC_GOI.size)
+        phan = goi[viTri:viTri + soByte]
+        cacMang.append(phan if ma == b"B" else phan.cast(ma.decode()))
+        viTri += soByte + -soByte % 8
+    return cacMang
+
+def _shared_tables(luoi: Grid, ten: str, tao) -> Optional[List[memoryview]]:
+    """
+    Tables of a grid from the shared maze store (see shared_store.SharedGrid), built with
+    tao() by the first worker on the host that asks; None for grids outside the store
+    """
+    shared_table = getattr(luoi, "shared_table", None)
+    if shared_table is None:
+        return None
+    goi = shared_table(ten, lambda: pack_tables(tao()))
+    return None if goi is None else unpack_tables(goi)
+
+def _ban_sao(luoi: Grid) -> Grid:
+    # Copy the rows: slicing a memoryview row would keep a shared segment mapped
+    return Grid(luoi.soHang, luoi.soCot, [list(hang) for hang in luoi.luoi])
+
+# Hierarchical graphs keyed by maze content, so repeated queries on a maze skip preprocessing
+HPA_CACHE_SIZE = 8
+_hpaCache: "OrderedDict[Tuple, HierarchicalGraph]" = OrderedDict()
+_hpaCacheLock = threading.Lock()
+
+def _grid_digest(luoi: Grid) -> Tuple[int, int, bytes]:
+    # Any non-zero cell is a wall, so hash walls as 1 whatever value the client sent
+    digest = hashlib.blake2b(b"".join(bytes(map(bool, hang)) for hang in luoi.luoi), digest_size=16).digest()
+    return (luoi.soHang, luoi.soCot, digest)
+
+def get_hierarchical_graph(luoi: Grid, clusterSize: int = 10) -> HierarchicalGraph:
+    cacMang = _shared_tables(luoi, f"hpa{clusterSize}", lambda: HierarchicalGraph(_ban_sao(luoi), clusterSize).cacMang)
+    if cacMang is not None:
+        # Views of the host-wide tables; not cached here so an evicted maze gets unmapped
+        return HierarchicalGraph(luoi, clusterSize, cacMang)
+    key = (clusterSize,) + _grid_digest(luoi)
+    with _hpaCacheLock:
+        graph = _hpaCache.get(key)
+        if graph is not None:
+            _hpaCache.move_to_end(key)
+            return graph
+    graph = HierarchicalGraph(_ban_sao(luoi), clusterSize)
+    with _hpaCacheLock:
+        _hpaCache[key] = graph
+        while len(_hpaCache) > HPA_CACHE_SIZE:
+            _hpaCache.popitem(last=False)
+    return graph
+
+def hpa_star_search_with_animation(luoi: Grid, diemBatDau: Node, diemKetThuc: Node, coins: Set[Node]):
+    graph = get_hierarchical_graph(luoi)
+    yield from graph.search_with_animation(diemBatDau, diemKetThuc, coins)
+
+
+
+class CorridorChains:
+    """
+    Degree-2 corridors of a maze, contracted into chains between vertices (junctions,
+    dead ends, and one cell per isolated loop). Chains are kept flat: chain i is
+    oChuoi[dauChuoi[i]:dauChuoi[i + 1]], the cells from one vertex to the other, both
+    included, and each interior cell records its chain and position in chuoiCuaO and
+    viTriCuaO (-1 elsewhere). Cells are flat indices (hang * soCot + cot).
+    """
+    def __init__(self, luoi: Grid, cacMang: Optional[List] = None):
+        self.luoi = luoi
+        self.cacMang = cacMang if cacMang is not None else self._tao_chuoi()
+        self.dauChuoi, self.oChuoi, self.chuoiCuaO, self.viTriCuaO = self.cacMang
+
+    def _tao_chuoi(self):
+        luoi, soCot = self.luoi, self.luoi.soCot
+        trong = lambda h, c: 0 <= h < luoi.soHang and 0 <= c < soCot and luoi.luoi[h][c] == 0
+        self.langGieng = {}
+        for h in range(luoi.soHang):
+            for c in range(soCot):
+                if luoi.luoi[h][c] == 0:
+                    self.langGieng[(h, c)] = [(h + dx, c + dy) for dx, dy in luoi.cacHuongKhongCheo if trong(h + dx, c + dy)]
+        self.dinh = {o for o, ke in self.langGieng.items() if len(ke) != 2}
+        self.chuoi = []  # List of chains
+        self.viTri = {}  # Interior cell -> (chain index, position in chain)
+
+        for u in list(self.dinh):
+            self._noi_tu_dinh(u)
+        # Loops with no junction at all: pin one cell as a vertex
+        for o in self.langGieng:
+            if o not in self.dinh and o not in self.viTri:
+                self.dinh.add(o)
+                self._noi_tu_dinh(o)
+
+        dauChuoi, oChuoi = array("i", [0]), array("i")
+        for chuoi in self.chuoi:
+            oChuoi.extend(h * soCot + c for h, c in chuoi)
+            dauChuoi.append(len(oChuoi))
+        chuoiCuaO = array("i", [-1]) * (luoi.soHang * soCot)
+        viTriCuaO = array("i", [-1]) * (luoi.soHang * soCot)
+        for (h, c), (i, j) in self.viTri.items():
+            chuoiCuaO[h * soCot + c] = i
+            viTriCuaO[h * soCot + c] = j
+        del self.langGieng, self.dinh, self.chuoi, self.viTri
+        return dauChuoi, oChuoi, chuoiCuaO, viTriCuaO
+
+    def _noi_tu_dinh(self, u: Tuple[int, int]):
+        for n in self.langGieng[u]:
+            if n in self.dinh:
+                if u < n:
+                    self.chuoi.append([u, n])
+            elif n not in self.viTri:
+                chuoi = [u, n]
+                truoc, o = u, n
+                while o not in self.dinh:
+                    a, b = self.langGieng[o]
+                    truoc, o = o, (b if a == truoc else a)
+                    chuoi.append(o)
+                for i in range(1, len(chuoi) - 1):
+                    self.viTri[chuoi[i]] = (len(self.chuoi), i)
+                self.chuoi.append(chuoi)
+
+
+class ContractedGrid(Grid):
+    """
+    Grid view whose neighbours are the ends of contracted corridors, weighted by their
+    length in cells. Pinned cells (start, goal, coins) split the corridors they lie on so
+    they stay vertices. Weighted searches built on layLangGieng run on it unchanged.
+    """
+    def __init__(self, luoi: Grid, ghim: Set[Node]):
+        super().__init__(luoi.soHang, luoi.soCot, luoi.luoi)
+        self.cacChuoi = get_corridor_chains(luoi)
+        self.ke = defaultdict(dict)  # Node -> {Node: cost}
+        self.doan = {}  # (Node, Node) -> (first, last) positions in oChuoi of the cells between them
+
+        dauChuoi = self.cacChuoi.dauChuoi
+        catTheoChuoi = defaultdict(set)
+        for nut in ghim:
+            o = nut.hang * self.soCot + nut.cot
+            if self.cacChuoi.chuoiCuaO[o] >= 0:
+                catTheoChuoi[self.cacChuoi.chuoiCuaO[o]].add(self.cacChuoi.viTriCuaO[o])
+        for i in range(len(dauChuoi) - 1):
+            dau = dauChuoi[i]
+            diemCat = [0] + sorted(catTheoChuoi.get(i, ())) + [dauChuoi[i + 1] - dau - 1]
+            for a, b in zip(diemCat, diemCat[1:]):
+                self._them_canh(dau + a, dau + b)
+
+    def _o(self, viTri: int) -> Node:
+        return Node(*divmod(self.cacChuoi.oChuoi[viTri], self.soCot))
+
+    def _them_canh(self, a: int, b: int):
+        u, v = self._o(a), self._o(b)
+        chiPhi = b - a
+        if u == v or chiPhi >= self.ke[u].get(v, math.inf):
+            return
+        self.ke[u][v] = chiPhi
+        self.ke[v][u] = chiPhi
+        self.doan[(u, v)] = (a, b)
+        self.doan[(v, u)] = (b, a)
+
+    def layLangGieng(self, nut: Node, baoGomCheo: bool = True) -> List[Tuple[Node, float]]:
+        return list(self.ke.get(nut, {}).items())
+
+    def layLangGiengKhongChiPhi(self, nut: Node, baoGomCheo: bool = True) -> List[Node]:
+        return list(self.ke.get(nut, {}))
+
+    def expand_path(self, duongDi: List[Node]) -> List[Node]:
+        if not duongDi:
+            return []
+        ketQua = [duongDi[0]]
+        for u, v in zip(duongDi, duongDi[1:]):
+            a, b = self.doan[(u, v)]
+            buoc = 1 if b > a else -1
+            ketQua.extend(self._o(i) for i in range(a + buoc, b + buoc, buoc))
+        return ketQua
+
+
+CORRIDOR_CACHE_SIZE = 8
+_corridorCache: "OrderedDict[Tuple, CorridorChains]" = OrderedDict()
+_corridorCacheLock = threading.Lock()
+
+def get_corridor_chains(luoi: Grid) -> CorridorChains:
+    cacMang = _shared_tables(luoi, "chains", lambda: CorridorChains(_ban_sao(luoi)).cacMang)
+    if cacMang is not None:
+        return CorridorChains(luoi, cacMang)
+    key = _grid_digest(luoi)
+    with _corridorCacheLock:
+        chains = _corridorCache.get(key)
+        if chains is not None:
+            _corridorCache.move_to_end(key)
+            return chains
+    chains = CorridorChains(_ban_sao(luoi))
+    with _corridorCacheLock:
+        _corridorCache[key] = chains
+        while len(_corridorCache) > CORRIDOR_CACHE_SIZE:
+            _corridorCache.popitem(last=False)
+    return chains
+
+def _contracted_search_with_animation(search, luoi: Grid, diemBatDau: Node, diemKetThuc: Node, coins: Set[Node]):
+    if not (luoi.hopLe(diemBatDau) and luoi.hopLe(diemKetThuc)):
+        yield [], []
+        return
+    luoiRutGon = ContractedGrid(luoi, coins | {diemBatDau, diemKetThuc})
+    for duongDi, cacNutDaTham in search(luoiRutGon, diemBatDau, diemKetThuc, coins):
+        yield luoiRutGon.expand_path(duongDi), cacNutDaTham
+
+def contracted(search):
+    """Wrap a weighted search (A*, Dijkstra, LRTA*) to run on the corridor-contracted graph"""
+    return partial(_contracted_search_with_animation, search)
@@ -0,0 +1,194 @@
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Tuple, Any
+from algo2 import Grid, Node
+
+TOURNAMENT_WORKERS = os.cpu_count() or 1
+
+def race_agents(gen1, gen2, states: Optional[List[Dict[str, Any]]] = None, budget=None,
+                on_step: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[int, int, bool, bool, bool]:
+    """
+    Step two search generators in lockstep until each finds a path or runs out.
+    Appends one frame per round to `states` and passes it to `on_step` when given;
+    returns (steps1, steps2, truncated, found1, found2) where found means a path was yielded.
+    """
+    path1_complete = False
+    path2_complete = False
+    found1 = False
+    found2 = False
+    steps1 = 0
+    steps2 = 0
+    truncated = False
+
+    while not (path1_complete and path2_complete):
+        if budget is not None and budget.exhausted(max(steps1, steps2)):
+            truncated = True
+            gen1.close()
+            gen2.close()
+            break
+
+        current_state = {
+            "agent1": {"path": [], "visited": [], "steps": steps1},
+            "agent2": {"path": [], "visited": [], "steps": steps2}
+        }
+
+        # Update agent 1
+        if not path1_complete:
+            try:
+                path, visited = next(gen1)
+                current_state["agent1"]["visited"] = visited
+                if path:
+                    path1_complete = True
+                    found1 = True
+                    current_state["agent1"]["path"] = [
+                        [p.hang, p.cot] for p in path
+                    ]
+                steps1 += 1
+            except StopIteration:
+                path1_complete = True
+
+        # Update agent 2
+        if not path2_complete:
+            try:
+                path, visited = next(gen2)
+                current_state["agent2"]["visited"] = visited
+                if path:
+                    path2_complete = True
+                    found2 = True
+                    current_state["agent2"]["path"] = [
+                        [p.hang, p.cot] for p in path
+                    ]
+                steps2 += 1
+            except StopIteration:
+                path2_complete = True
+
+        if states is not None:
+            states.append(current_state.copy())
+        if on_step is not None:
+            on_step(current_state)
+
+    return steps1, steps2, truncated, found1, found2
+
+def race_winner(steps1: int, steps2: int, truncated: bool, found1: bool, found2: bool) -> Optional[str]:
+    """Fewer steps wins (ties to agent1); a cut-short race is only won by an agent that found a path"""
+    if truncated:
+        if found1 != found2:
+            return "agent1" if found1 else "agent2"
+        return None
+    return "agent1" if steps1 <= steps2 else "agent2"
+
+def maze_endpoints(generator: str, grid: List[List[int]]) -> Tuple[Node, Node, Node]:
+    """Starts and goal the way each generator lays them out: mirrored starts for symmetric mazes"""
+    rows, cols = len(grid), len(grid[0])
+    if generator == "symmetric":
+        return Node(1, 1), Node(1, cols - 2), Node(rows // 2, cols // 2)
+    return Node(1, 1), Node(1, 1), Node(rows - 2, cols - 2)
+
+def play_tournament_maze(generator: str, make_maze: Callable, rows: int, cols: int, seed: int,
+                         algos: Dict[str, Callable]) -> List[Dict[str, Any]]:
+    """Generate one seeded maze and race every pair of algorithms on it, without frames"""
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))  # Deep backtracking searches
+    random.seed(seed)
+    grid_data = make_maze(rows, cols)
+    grid = Grid(len(grid_data), len(grid_data[0]), grid_data)
+    start1, start2, goal = maze_endpoints(generator, grid_data)
+    results = []
+    for name1, name2 in combinations(algos, 2):
+        t0 = time.perf_counter()
+        steps1, steps2, _, found1, found2 = race_agents(
+            algos[name1](grid, start1, goal, set()),
+            algos[name2](grid, start2, goal, set())
+        )
+        results.append({
+            "seed": seed,
+            "algo1": name1,
+            "algo2": name2,
+            "steps1": steps1,
+            "steps2": steps2,
+            "found1": found1,
+            "found2": found2,
+            "seconds": time.perf_counter() - t0
+        })
+    return results
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "min": ordered[0],
+        "mean": statistics.fmean(ordered),
+        "median": statistics.median(ordered),
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "max": ordered[-1]
+    }
+
+def match_outcome(steps1: int, steps2: int, found1: bool, found2: bool) -> int:
+    """1 if agent1 wins, -1 if agent2 wins, 0 for a draw; an agent without a path loses"""
+    if found1 != found2:
+        return 1 if found1 else -1
+    if not found1 or steps1 == steps2:
+        return 0
+    return 1 if steps1 < steps2 else -1
+
+def summarize_tournament(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Win rates per algorithm and per pairing. Finding a path beats not finding one, then
+    fewer steps wins; equal step counts and matches where neither finds a path are draws.
+    """
+    per_algo = {}
+    per_pair = {}
+    for m in matches:
+        pair = per_pair.setdefault(f"{m['algo1']} vs {m['algo2']}", {"algo1_wins": 0, "algo2_wins": 0, "draws": 0})
+        outcome = match_outcome(m["steps1"], m["steps2"], m["found1"], m["found2"])
+        for name, own, found, result in ((m["algo1"], m["steps1"], m["found1"], outcome),
+                                         (m["algo2"], m["steps2"], m["found2"], -outcome)):
+            stats = per_algo.setdefault(name, {"wins": 0, "losses": 0, "draws": 0, "no_path": 0, "steps": [], "seconds": []})
+            stats["steps"].append(own)
+            stats["seconds"].append(m["seconds"])
+            stats["no_path"] += not found
+            if result > 0:
+                stats["wins"] += 1
+            elif result < 0:
+                stats["losses"] += 1
+            else:
+                stats["draws"] += 1
+        if outcome > 0:
+            pair["algo1_wins"] += 1
+        elif outcome < 0:
+            pair["algo2_wins"] += 1
+        else:
+            pair["draws"] += 1
+
+    algorithms = {}
+    for name, stats in per_algo.items():
+        played = len(stats["steps"])
+        algorithms[name] = {
+            "matches": played,
+            "wins": stats["wins"],
+            "losses": stats["losses"],
+            "draws": stats["draws"],
+            "no_path": stats["no_path"],
+            "win_rate": stats["wins"] / played,
+            "steps": _distribution(stats["steps"]),
+            "match_seconds": _distribution(stats["seconds"])
+        }
+    return {"algorithms": algorithms, "pairings": per_pair}
+
+_executor = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process pool shared by tournament requests, one worker per core.
+
+    Workers are started from a forkserver (spawn where unavailable): the server process
+    already runs threads, and forking it directly can deadlock the children.
+    """
+    global _executor
+    if _executor is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(max_workers=TOURNAMENT_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _executor
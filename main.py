@@ -1,14 +1,41 @@
-from fastapi import FastAPI
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, FileResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from maze import *
 from algo2 import *
-from typing import List, Set, Dict, Any
+from maze_pool import MazePool
+from shared_store import SharedMazeStore
+from profiling import RequestProfile, current_profile, profile_phase, store_profile, stored_profiles
+from competition import race_agents, race_winner, play_tournament_maze, summarize_tournament, get_executor, TOURNAMENT_WORKERS
+from typing import List, Set, Dict, Any, Optional
 
 ROWS = 31
 COLS = 101
 
+# Mazes shared by all worker processes on this host, removed when the last worker exits
+maze_store = SharedMazeStore()
+atexit.register(maze_store.close)
+
+# Sizes the maze generators accept from clients
+MIN_MAZE_SIZE = 3
+MAX_MAZE_SIZE = 301
+
+# Ready-made mazes per (generator, rows, cols), refilled in the background
+maze_pool = MazePool({
+    "random": generate_random_maze,
+    "symmetric": generate_symmetric_maze
+})
+
 class CompetitiveMazeRequest(BaseModel):
     grid: List[List[int]]
     starts: List[List[int]]
@@ -16,64 +43,203 @@ class CompetitiveMazeRequest(BaseModel):
     coins: List[List[int]]
     algo1: str
     algo2: str
+    max_expansions: Optional[int] = Field(None, gt=0)
+    time_limit_ms: Optional[float] = Field(None, gt=0)
 
 class MazeRequest(BaseModel):
+    grid: List[List[int]] = []
+    maze_id: Optional[str] = None  # Use a maze registered with POST /mazes instead of grid
+    start: List[int]
+    goal: List[int]
+    coins: List[List[int]] = []
+    max_expansions: Optional[int] = Field(None, gt=0)
+    time_limit_ms: Optional[float] = Field(None, gt=0)
+    contract: bool = False  # Search on the corridor-contracted graph (astar, dijkstra, lrta)
+
+class StoreMazeRequest(BaseModel):
+    grid: List[List[int]]
+
+class TournamentRequest(BaseModel):
+    generator: str = "symmetric"
+    rows: int = ROWS
+    cols: int = COLS
+    seed_start: int = 0
+    seed_end: int = 10  # Exclusive
+    algos: List[str]
+
+class ReplanSessionRequest(BaseModel):
     grid: List[List[int]]
     start: List[int]
     goal: List[int]
     coins: List[List[int]] = []
 
+class ReplanUpdateRequest(BaseModel):
+    changes: List[List[int]] = []  # [row, col, value] cell edits
+    start: Optional[List[int]] = None
+
 app = FastAPI()
 
+# Opt-in per-request profiling: enabled on the server with MAZE_PROFILING=1, then
+# requested per call with an "X-Profile: 1" header or "?profile=1"
+PROFILING_ENABLED = os.environ.get("MAZE_PROFILING") == "1"
+PROFILED_ROUTES = {"/astar", "/bfs", "/lrta", "/onlinedfs", "/dijkstra", "/binary", "/bidirectional", "/hpastar", "/pareto", "/competitive"}
+
+if PROFILING_ENABLED:
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        wanted = request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"
+        if not wanted or request.url.path not in PROFILED_ROUTES:
+            return await call_next(request)
+        profile = RequestProfile(request.url.path)
+        if not profile.start():
+            response = await call_next(request)
+            response.headers["X-Profile"] = "busy"
+            return response
+        token = current_profile.set(profile)
+        try:
+            response = await call_next(request)
+        finally:
+            current_profile.reset(token)
+            profile.stop()
+        summary = profile.summary()
+        store_profile(summary)
+        response.headers["X-Profile-Id"] = summary["id"]
+        response.headers["Server-Timing"] = ", ".join(
+            f'{p["name"]};dur={p["ms"]:.2f}' for p in summary["phases"]
+        )
+        return response
+
+    @app.get("/debug/profiles")
+    def list_profiles():
+        return list(stored_profiles.values())
+
+    @app.get("/debug/profiles/{profile_id}")
+    def get_profile(profile_id: str):
+        if profile_id not in stored_profiles:
+            raise HTTPException(status_code=404, detail="Unknown profile")
+        return stored_profiles[profile_id]
+
+# How often (seconds) a running request checks whether its client went away
+DISCONNECT_POLL_INTERVAL = 0.1
+
+class SearchBudget:
+    """Limits one request's work: generator steps, wall-clock time and cancellation"""
+    def __init__(self, max_expansions: Optional[int] = None, time_limit_ms: Optional[float] = None):
+        if (max_expansions is not None and max_expansions <= 0) or (time_limit_ms is not None and time_limit_ms <= 0):
+            raise ValueError("max_expansions and time_limit_ms must be positive")
+        self.max_expansions = max_expansions
+        self.deadline = time.monotonic() + time_limit_ms / 1000 if time_limit_ms is not None else None
+        self.cancelled = threading.Event()
+
+    @classmethod
+    def from_request(cls, req) -> 'SearchBudget':
+        return cls(req.max_expansions, req.time_limit_ms)
+
+    def exhausted(self, steps: int) -> bool:
+        if self.cancelled.is_set():
+            return True
+        if self.max_expansions is not None and steps >= self.max_expansions:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+async def run_cancellable(request: Request, budget: SearchBudget, func, *args):
+    """Run a blocking search in the threadpool, cancelling it if the client disconnects"""
+    async def watch_disconnect():
+        while not budget.cancelled.is_set():
+            if await request.is_disconnected():
+                budget.cancelled.set()
+                return
+            await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+    profile = current_profile.get()
+    if profile is not None:
+        func, args = profile.run, (func,) + args
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        return await run_in_threadpool(func, *args)
+    finally:
+        watcher.cancel()
+
+def validate_grid(grid: List[List[int]]):
+    if not grid or not grid[0] or any(len(row) != len(grid[0]) for row in grid):
+        raise HTTPException(status_code=400, detail="Grid must be a non-empty rectangle")
+
+def validate_cell(rows: int, cols: int, cell: List[int], name: str):
+    if len(cell) != 2 or not (0 <= cell[0] < rows and 0 <= cell[1] < cols):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {cell}")
+
 def create_grid_and_nodes(req: MazeRequest):
     """Helper function to create grid and nodes from request"""
-    grid = Grid(len(req.grid), len(req.grid[0]), req.grid)
-    start_node = Node(req.start[0], req.start[1])
-    goal_node = Node(req.goal[0], req.goal[1])
-    coins = {Node(x, y) for x, y in req.coins}
+    with profile_phase("create_grid_and_nodes"):
+        if req.maze_id:
+            grid = maze_store.grid(req.maze_id)
+            if grid is None:
+                raise HTTPException(status_code=404, detail="Unknown maze")
+        elif req.grid:
+            grid = Grid(len(req.grid), len(req.grid[0]), req.grid)
+        else:
+            raise HTTPException(status_code=400, detail="Missing grid or maze_id")
+        start_node = Node(req.start[0], req.start[1])
+        goal_node = Node(req.goal[0], req.goal[1])
+        coins = {Node(x, y) for x, y in req.coins}
     return grid, start_node, goal_node, coins
 
-def process_search_result(generator, coins_set: Set[Node]) -> Dict[str, Any]:
-    """Process search results after collecting all possible paths"""
-    all_paths = []  # Store all paths and their info
+def process_search_result(generator, coins_set: Set[Node], budget: Optional[SearchBudget] = None,
+                          on_step=None) -> Dict[str, Any]:
+    """Drive the search generator and keep the best path by coins, then length.
+
+    Stops early once the budget is exhausted and reports the best result so far
+    with "truncated" set. on_step(visited, steps) is called after every generator step.
+    """
+    best_path = None  # Best path and its info seen so far
+    last_visited = []
+    truncated = False
+    steps = 0
     
     try:
         import sys
         original_limit = sys.getrecursionlimit()
         sys.setrecursionlimit(10000)
         
-        # Collect all paths first
-        for path, visited in generator:
-            if path:
-                coins_collected = sum(1 for node in path if node in coins_set)
-                path_length = len(path)
-                all_paths.append({
-                    'path': path,
-                    'visited': visited,
-                    'coins': coins_collected,
-                    'length': path_length
-                })
+        with profile_phase("search"):
+            for path, visited in generator:
+                last_visited = visited
+                if path:
+                    # Distinct coins: coin-aware paths may walk over a cell twice
+                    coins_collected = len(coins_set.intersection(path))
+                    path_length = len(path)
+                    # Prefer more coins, then a shorter path
+                    if best_path is None or (coins_collected, -path_length) > (best_path['coins'], -best_path['length']):
+                        best_path = {
+                            'path': path,
+                            'visited': visited,
+                            'coins': coins_collected,
+                            'length': path_length
+                        }
+                steps += 1
+                if on_step is not None:
+                    on_step(visited, steps)
+                if budget is not None and budget.exhausted(steps):
+                    if path:
+                        # Generators end right after yielding their path; only a step
+                        # beyond it means the search was actually cut short
+                        continue
+                    truncated = True
+                    generator.close()
+                    break
         
-        if not all_paths:
+
+        if best_path is None:
             return {
                 "path": [],
-                "visited": [],
+                "visited": last_visited if truncated else [],
                 "cost": 0,
                 "length": 0,
                 "coins_collected": 0,
-                "score": 0
+                "score": 0,
+                "truncated": truncated
             }
         
-        # Sort paths by coins first, then by length
-        sorted_paths = sorted(
-            all_paths,
-            key=lambda x: (x['coins'], -x['length']),  # Sort by coins descending, then length ascending
-            reverse=True
-        )
-        
-        # Select best path
-        best_path = sorted_paths[0]
-        
         # Calculate final metrics
         total_coins = best_path['coins']
         path_length = best_path['length']
@@ -88,6 +254,7 @@ def process_search_result(generator, coins_set: Set[Node]) -> Dict[str, Any]:
             "length": 0,
             "coins_collected": 0,
             "score": 0,
+            "truncated": truncated,
             "error": "Path too deep - recursion limit reached"
         }
     finally:
@@ -99,56 +266,83 @@ def process_search_result(generator, coins_set: Set[Node]) -> Dict[str, Any]:
         "cost": total_cost,
         "length": path_length,
         "coins_collected": total_coins,
-        "score": score
+        "score": score,
+        "truncated": truncated
     }
 
 @app.post("/astar")
-def run_astar(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
-    generator = astar_search_with_animation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+async def run_astar(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
+    search = contracted(astar_search_with_animation) if req.contract else astar_search_with_animation
+    generator = search(grid, start, goal, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/bfs")
-def run_bfs(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
+async def run_bfs(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
     generator = bfs_search_withAnimation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/lrta")
-def run_lrta(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
-    generator = lrta_star_search_with_animation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+async def run_lrta(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
+    search = contracted(lrta_star_search_with_animation) if req.contract else lrta_star_search_with_animation
+    generator = search(grid, start, goal, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/onlinedfs")
-def run_online_dfs(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
+async def run_online_dfs(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
     generator = online_dfs_search_with_animation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/dijkstra")
-def run_dijkstra(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
-    generator = dijkstra_search_with_animation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+async def run_dijkstra(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
+    search = contracted(dijkstra_search_with_animation) if req.contract else dijkstra_search_with_animation
+    generator = search(grid, start, goal, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/binary")
-def run_binary_backtracking(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
+async def run_binary_backtracking(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
     generator = binary_backtracking_search_with_animation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/bidirectional")
-def run_bidirectional_search(req: MazeRequest):
-    grid, start, goal, coins = create_grid_and_nodes(req)
+async def run_bidirectional_search(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
     generator = bidirectional_search_with_animation(grid, start, goal, coins)
-    return process_search_result(generator, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
+
+@app.post("/hpastar")
+async def run_hpa_star(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
+    generator = hpa_star_search_with_animation(grid, start, goal, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
+
+@app.post("/pareto")
+async def run_pareto_coin_search(req: MazeRequest, request: Request):
+    grid, start, goal, coins = await run_in_threadpool(create_grid_and_nodes, req)
+    generator = pareto_coin_search_with_animation(grid, start, goal, coins)
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, process_search_result, generator, coins, budget)
 
 @app.post("/generate_symmetric_maze")
 def generate_maze_endpoint(data: dict):
     rows = data.get("rows", 20)
     cols = data.get("cols", 30)
-    maze = generate_symmetric_maze(rows, cols)
+    if not all(isinstance(n, int) and MIN_MAZE_SIZE <= n <= MAX_MAZE_SIZE for n in (rows, cols)):
+        raise HTTPException(status_code=400, detail=f"rows and cols must be integers from {MIN_MAZE_SIZE} to {MAX_MAZE_SIZE}")
+    maze = maze_pool.take("symmetric", rows, cols)
     return maze
 
 # Add algorithm mapping at the top of the file
@@ -159,11 +353,16 @@ algo_map = {
     "onlinedfs": online_dfs_search_with_animation,
     "dijkstra": dijkstra_search_with_animation,
     "binary": binary_backtracking_search_with_animation,
-    "bidirectional": bidirectional_search_with_animation
+    "bidirectional": bidirectional_search_with_animation,
+    "hpastar": hpa_star_search_with_animation,
+    "pareto": pareto_coin_search_with_animation
 }
 
-@app.post("/competitive")
-def run_competitive(req: CompetitiveMazeRequest):
+# Weighted searches that stay shortest on the corridor-contracted graph
+CONTRACTIBLE_ALGOS = {"astar", "dijkstra", "lrta"}
+
+def play_competition(req: CompetitiveMazeRequest, budget: Optional[SearchBudget] = None) -> Dict[str, Any]:
+    """Race both agents' generators until each finds a path or the budget runs out"""
     if not req.grid or not req.starts or len(req.starts) < 2 or not req.goal:
         raise HTTPException(
             status_code=400, 
@@ -172,11 +371,12 @@ def run_competitive(req: CompetitiveMazeRequest):
 
     try:
         # Create grid and nodes
-        grid = Grid(len(req.grid), len(req.grid[0]), req.grid)
-        start1 = Node(req.starts[0][0], req.starts[0][1])
-        start2 = Node(req.starts[1][0], req.starts[1][1])
-        goal = Node(req.goal[0], req.goal[1])
-        coins = {Node(x, y) for x, y in req.coins} if req.coins else set()
+        with profile_phase("create_grid_and_nodes"):
+            grid = Grid(len(req.grid), len(req.grid[0]), req.grid)
+            start1 = Node(req.starts[0][0], req.starts[0][1])
+            start2 = Node(req.starts[1][0], req.starts[1][1])
+            goal = Node(req.goal[0], req.goal[1])
+            coins = {Node(x, y) for x, y in req.coins} if req.coins else set()
 
         # Get algorithm functions
         gen1 = algo_map.get(req.algo1)
@@ -200,52 +400,15 @@ def run_competitive(req: CompetitiveMazeRequest):
         }
         states.append(current_state.copy())
 
-        path1_complete = False
-        path2_complete = False
-        steps1 = 0
-        steps2 = 0
-
-        while not (path1_complete and path2_complete):
-            current_state = {
-                "agent1": {"path": [], "visited": [], "steps": steps1},
-                "agent2": {"path": [], "visited": [], "steps": steps2}
-            }
-
-            # Update agent 1
-            if not path1_complete:
-                try:
-                    path, visited = next(gen1)
-                    current_state["agent1"]["visited"] = visited
-                    if path:
-                        path1_complete = True
-                        current_state["agent1"]["path"] = [
-                            [p.hang, p.cot] for p in path
-                        ]
-                    steps1 += 1
-                except StopIteration:
-                    path1_complete = True
-
-            # Update agent 2
-            if not path2_complete:
-                try:
-                    path, visited = next(gen2)
-                    current_state["agent2"]["visited"] = visited
-                    if path:
-                        path2_complete = True
-                        current_state["agent2"]["path"] = [
-                            [p.hang, p.cot] for p in path
-                        ]
-                    steps2 += 1
-                except StopIteration:
-                    path2_complete = True
-
-            states.append(current_state.copy())
+        with profile_phase("race"):
+            steps1, steps2, truncated, found1, found2 = race_agents(gen1, gen2, states, budget)
 
         return {
             "states": states,
-            "winner": "agent1" if steps1 <= steps2 else "agent2",
+            "winner": race_winner(steps1, steps2, truncated, found1, found2),
             "agent1_steps": steps1,
-            "agent2_steps": steps2
+            "agent2_steps": steps2,
+            "truncated": truncated
         }
 
     except Exception as e:
@@ -254,6 +417,349 @@ def run_competitive(req: CompetitiveMazeRequest):
             detail=f"Error processing competition: {str(e)}"
         )
 
+@app.post("/competitive")
+async def run_competitive(req: CompetitiveMazeRequest, request: Request):
+    budget = SearchBudget.from_request(req)
+    return await run_cancellable(request, budget, play_competition, req, budget)
+
+@app.post("/mazes")
+def store_maze(req: StoreMazeRequest):
+    validate_grid(req.grid)
+    try:
+        maze_id = maze_store.put(req.grid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"maze_id": maze_id, "rows": len(req.grid), "cols": len(req.grid[0])}
+
+@app.get("/mazes/{maze_id}")
+def get_stored_maze(maze_id: str):
+    grid = maze_store.grid(maze_id)
+    if grid is None:
+        raise HTTPException(status_code=404, detail="Unknown maze")
+    return {"maze_id": maze_id, "rows": grid.soHang, "cols": grid.soCot}
+
+@app.delete("/mazes/{maze_id}")
+def delete_stored_maze(maze_id: str):
+    maze_store.unlink(maze_id)
+    return {"deleted": maze_id}
+
+# Maze generators available to the tournament, by name
+maze_generators = {
+    "random": generate_random_maze,
+    "symmetric": generate_symmetric_maze
+}
+MAX_TOURNAMENT_MAZES = 1000
+MAX_TOURNAMENT_SIZE = 101  # Keeps backtracking searches within the workers' recursion limit
+# Tournaments rank by generator steps; HPA* steps are abstract-graph pops, not cell expansions
+TOURNAMENT_EXCLUDED = {"hpastar"}
+
+@app.post("/tournament")
+def run_tournament(req: TournamentRequest):
+    make_maze = maze_generators.get(req.generator)
+    if make_maze is None:
+        raise HTTPException(status_code=400, detail="Invalid generator selection")
+    if len(set(req.algos)) < 2 or any(name not in algo_map or name in TOURNAMENT_EXCLUDED for name in req.algos):
+        raise HTTPException(status_code=400, detail="Invalid algorithm selection")
+    if not all(MIN_MAZE_SIZE <= n <= MAX_TOURNAMENT_SIZE for n in (req.rows, req.cols)):
+        raise HTTPException(status_code=400, detail=f"rows and cols must be from {MIN_MAZE_SIZE} to {MAX_TOURNAMENT_SIZE}")
+    seeds = range(req.seed_start, req.seed_end)
+    if not 0 < len(seeds) <= MAX_TOURNAMENT_MAZES:
+        raise HTTPException(status_code=400, detail=f"Seed range must cover 1 to {MAX_TOURNAMENT_MAZES} mazes")
+
+    algos = {name: algo_map[name] for name in dict.fromkeys(req.algos)}
+    t0 = time.perf_counter()
+    executor = get_executor()
+    futures = [
+        executor.submit(play_tournament_maze, req.generator, make_maze, req.rows, req.cols, seed, algos)
+        for seed in seeds
+    ]
+    matches = [match for future in futures for match in future.result()]
+    elapsed = time.perf_counter() - t0
+
+    return {
+        **summarize_tournament(matches),
+        "mazes": len(seeds),
+        "matches": len(matches),
+        "workers": TOURNAMENT_WORKERS,
+        "seconds": elapsed,
+        "matches_per_second": len(matches) / elapsed if elapsed > 0 else 0.0
+    }
+
+# Incremental replanning sessions for the maze editor, oldest evicted first
+MAX_REPLAN_SESSIONS = 64
+replan_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+replan_sessions_lock = threading.Lock()
+
+def replan_result(session: Dict[str, Any]) -> Dict[str, Any]:
+    planner = session["planner"]
+    path = planner.path()
+    coins_collected = sum(1 for node in path if node in session["coins"])
+    return {
+        "path": [(p.hang, p.cot) for p in path],
+        "visited": [(n.hang, n.cot, 3 if n in session["coins"] else -1) for n in planner.expanded],
+        "expanded": len(planner.expanded),
+        "length": len(path),
+        "coins_collected": coins_collected,
+        "score": coins_collected * 1000 - len(path)
+    }
+
+def get_replan_session(session_id: str) -> Dict[str, Any]:
+    with replan_sessions_lock:
+        session = replan_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown replanning session")
+        replan_sessions.move_to_end(session_id)
+        return session
+
+@app.post("/replan/session")
+def open_replan_session(req: ReplanSessionRequest):
+    validate_grid(req.grid)
+    validate_cell(len(req.grid), len(req.grid[0]), req.start, "start")
+    validate_cell(len(req.grid), len(req.grid[0]), req.goal, "goal")
+    grid = Grid(len(req.grid), len(req.grid[0]), [row[:] for row in req.grid])
+    planner = DStarLite(grid, Node(req.start[0], req.start[1]), Node(req.goal[0], req.goal[1]))
+    planner.compute_shortest_path()
+    session = {
+        "planner": planner,
+        "coins": {Node(x, y) for x, y in req.coins},
+        "lock": threading.Lock()
+    }
+    session_id = uuid.uuid4().hex
+    with replan_sessions_lock:
+        replan_sessions[session_id] = session
+        while len(replan_sessions) > MAX_REPLAN_SESSIONS:
+            replan_sessions.popitem(last=False)
+    return {"session_id": session_id, **replan_result(session)}
+
+@app.post("/replan/{session_id}")
+def update_replan_session(session_id: str, req: ReplanUpdateRequest):
+    session = get_replan_session(session_id)
+    planner = session["planner"]
+    with session["lock"]:
+        for change in req.changes:
+            if len(change) != 3 or not (0 <= change[0] < planner.luoi.soHang and 0 <= change[1] < planner.luoi.soCot):
+                raise HTTPException(status_code=400, detail=f"Invalid cell change: {change}")
+        if req.start is not None:
+            validate_cell(planner.luoi.soHang, planner.luoi.soCot, req.start, "start")
+            planner.move_start(Node(req.start[0], req.start[1]))
+        planner.update_cells([tuple(change) for change in req.changes])
+        planner.compute_shortest_path()
+        return replan_result(session)
+
+@app.delete("/replan/{session_id}")
+def close_replan_session(session_id: str):
+    with replan_sessions_lock:
+        replan_sessions.pop(session_id, None)
+    return {"closed": session_id}
+
+# WebSocket editor sessions: the maze stays in server memory for the connection,
+# clients send small edit/run commands and search frames are streamed back
+WS_FRAME_BUFFER = 8  # Frames queued per connection before the search waits for the client
+
+def visited_delta(sent: Dict[str, int], key: str, visited: List) -> List:
+    """Visited cells not yet sent for this agent; generators only ever append to visited"""
+    new = visited[sent.get(key, 0):]
+    sent[key] = sent.get(key, 0) + len(new)
+    return new
+
+async def stream_frames(websocket: WebSocket, budget: SearchBudget, produce):
+    """Run produce(emit) in the threadpool and forward what it emits, one frame at a time.
+
+    emit blocks the search thread while WS_FRAME_BUFFER frames are waiting, so a slow
+    client slows the search instead of growing memory. If sending fails the search is
+    cancelled and the remaining frames are drained.
+    """
+    loop = asyncio.get_running_loop()
+    frames: asyncio.Queue = asyncio.Queue(maxsize=WS_FRAME_BUFFER)
+
+    def emit(frame):
+        asyncio.run_coroutine_threadsafe(frames.put(frame), loop).result()
+
+    def run():
+        try:
+            emit(produce(emit))
+        except Exception as e:
+            emit({"type": "error", "detail": str(e)})
+        finally:
+            emit(None)
+
+    producer = asyncio.ensure_future(run_in_threadpool(run))
+    sending = True
+    while True:
+        frame = await frames.get()
+        if frame is None:
+            break
+        if sending:
+            try:
+                await websocket.send_json(frame)
+            except Exception:
+                sending = False
+                budget.cancelled.set()
+    await producer
+
+def socket_search(session: Dict[str, Any], msg: Dict[str, Any], budget: SearchBudget):
+    algo = algo_map.get(msg.get("algo"))
+    if algo is None:
+        raise ValueError("Invalid algorithm selection")
+    if msg.get("contract"):
+        if msg["algo"] not in CONTRACTIBLE_ALGOS:
+            raise ValueError(f"contract is only supported for {', '.join(sorted(CONTRACTIBLE_ALGOS))}")
+        algo = contracted(algo)
+    grid = Grid(len(session["grid"]), len(session["grid"][0]), [row[:] for row in session["grid"]])
+    coins = set(session["coins"])
+    generator = algo(grid, session["start"], session["goal"], coins)
+    frame_every = max(1, int(msg.get("frame_every", 1)))
+
+    def produce(emit):
+        sent = {}
+
+        def on_step(visited, steps):
+            if steps % frame_every == 0:
+                emit({"type": "frame", "step": steps, "visited": visited_delta(sent, "agent", visited)})
+
+        result = process_search_result(generator, coins, budget, on_step)
+        # Cells visited since the last frame; the client already has the rest
+        visited = result.pop("visited")
+        emit({"type": "frame", "step": None, "visited": visited_delta(sent, "agent", visited)})
+        return {"type": "result", **result}
+
+    return produce
+
+def socket_compete(session: Dict[str, Any], msg: Dict[str, Any], budget: SearchBudget):
+    gen1, gen2 = algo_map.get(msg.get("algo1")), algo_map.get(msg.get("algo2"))
+    starts = msg.get("starts") or []
+    if not gen1 or not gen2:
+        raise ValueError("Invalid algorithm selection")
+    if len(starts) < 2:
+        raise ValueError("Missing or invalid input data")
+    grid = Grid(len(session["grid"]), len(session["grid"][0]), [row[:] for row in session["grid"]])
+    coins = set(session["coins"])
+    gen1 = gen1(grid, Node(*starts[0]), session["goal"], coins)
+    gen2 = gen2(grid, Node(*starts[1]), session["goal"], coins)
+
+    def produce(emit):
+        sent = {}
+
+        def on_step(state):
+            emit({"type": "frame", **{
+                agent: {
+                    "steps": state[agent]["steps"],
+                    "visited": visited_delta(sent, agent, state[agent]["visited"]),
+                    "path": state[agent]["path"]
+                } for agent in ("agent1", "agent2")
+            }})
+
+        steps1, steps2, truncated, found1, found2 = race_agents(gen1, gen2, None, budget, on_step)
+        return {
+            "type": "result",
+            "winner": race_winner(steps1, steps2, truncated, found1, found2),
+            "agent1_steps": steps1,
+            "agent2_steps": steps2,
+            "truncated": truncated
+        }
+
+    return produce
+
+async def receive_command(websocket: WebSocket) -> Dict[str, Any]:
+    """Next client command; frames that are not a JSON object raise ValueError"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message["code"], message.get("reason"))
+    if message.get("text") is None:
+        raise ValueError("Commands must be JSON text frames")
+    try:
+        msg = json.loads(message["text"])
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(msg, dict):
+        raise ValueError("Commands must be JSON objects")
+    return msg
+
+def socket_load(session: Dict[str, Any], msg: Dict[str, Any]):
+    if msg.get("maze_id"):
+        grid = maze_store.grid(msg["maze_id"])
+        if grid is None:
+            raise ValueError("Unknown maze")
+        session["grid"] = [list(row) for row in grid.luoi]
+    elif msg.get("grid"):
+        session["grid"] = [list(row) for row in msg["grid"]]
+    else:
+        raise ValueError("Missing grid or maze_id")
+    socket_set(session, msg)
+
+def socket_set(session: Dict[str, Any], msg: Dict[str, Any]):
+    if msg.get("start") is not None:
+        session["start"] = Node(*msg["start"])
+    if msg.get("goal") is not None:
+        session["goal"] = Node(*msg["goal"])
+    if msg.get("coins") is not None:
+        session["coins"] = {Node(x, y) for x, y in msg["coins"]}
+
+def socket_edit(session: Dict[str, Any], msg: Dict[str, Any]):
+    grid = session["grid"]
+    for hang, cot, value in msg.get("changes", []):
+        if not (0 <= hang < len(grid) and 0 <= cot < len(grid[0])):
+            raise ValueError(f"Invalid cell change: {[hang, cot, value]}")
+        grid[hang][cot] = value
+
+@app.websocket("/ws")
+async def editor_socket(websocket: WebSocket):
+    """
+    Commands (JSON, by "type"): load {grid | maze_id, start, goal, coins}, set {start, goal, coins},
+    edit {changes: [[row, col, value]]}, run {algo, contract, frame_every, max_expansions,
+    time_limit_ms}, compete {algo1, algo2, starts, ...} and cancel. Runs stream "frame"
+    messages carrying only newly visited cells, then one "result".
+    """
+    await websocket.accept()
+    session = {"grid": None, "start": None, "goal": None, "coins": set()}
+    running = None  # (task, budget) of the search being streamed
+
+    async def stop_running():
+        nonlocal running
+        if running is not None:
+            task, budget = running
+            budget.cancelled.set()
+            await task
+            running = None
+
+    try:
+        while True:
+            try:
+                msg = await receive_command(websocket)
+                kind = msg.get("type")
+                if running is not None and running[0].done():
+                    running = None
+                if kind == "cancel":
+                    await stop_running()
+                elif kind in ("load", "set", "edit"):
+                    await stop_running()
+                    if kind != "load" and session["grid"] is None:
+                        raise ValueError("No maze loaded")
+                    if kind == "load":
+                        # Attaching a stored maze waits on the host-wide store lock
+                        await run_in_threadpool(socket_load, session, msg)
+                    else:
+                        {"set": socket_set, "edit": socket_edit}[kind](session, msg)
+                    await websocket.send_json({"type": kind + "ed" if kind != "set" else "set"})
+                elif kind in ("run", "compete"):
+                    await stop_running()
+                    if session["grid"] is None or session["goal"] is None:
+                        raise ValueError("Load a maze with a goal first")
+                    if kind == "run" and session["start"] is None:
+                        raise ValueError("Missing start point")
+                    budget = SearchBudget(msg.get("max_expansions"), msg.get("time_limit_ms"))
+                    make = socket_search if kind == "run" else socket_compete
+                    produce = make(session, msg, budget)
+                    running = (asyncio.create_task(stream_frames(websocket, budget, produce)), budget)
+                else:
+                    raise ValueError(f"Unknown command: {kind}")
+            except (ValueError, TypeError, KeyError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await stop_running()
+
 # File serving routes
 @app.get("/style.css")
 def get_css():
@@ -280,7 +786,11 @@ def serve_competitive():
 # Maze generation route
 @app.post("/generate")
 def generate(req: dict):
-    grid = generate_random_maze(ROWS, COLS)
+    grid = maze_pool.take("random", ROWS, COLS)
     return {"rows": ROWS, "cols": COLS, "grid": grid}
 
+@app.get("/metrics/maze_pool")
+def get_maze_pool_metrics():
+    return maze_pool.metrics()
+
 #change nodejs version
\ No newline at end of file
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Tuple, Any
+
+PoolKey = Tuple[str, int, int]
+
+class MazePool:
+    """Bounded pools of pre-generated mazes keyed by (generator, rows, cols).
+
+    A daemon thread keeps every requested key topped up to `depth` mazes.
+    `take` pops a ready maze in O(1) and falls back to generating one on the
+    calling thread when the pool for that key is empty. Only sizes up to
+    `max_cells` become pool keys; larger ones are always generated on demand.
+    """
+    def __init__(self, generators: Dict[str, Callable[[int, int], List[List[int]]]],
+                 depth: int = 8, refill_interval: float = 0.05, max_keys: int = 8,
+                 max_cells: int = 128 * 256):
+        self.generators = generators
+        self.depth = depth
+        self.refill_interval = refill_interval  # Pause between background generations
+        self.max_keys = max_keys
+        self.max_cells = max_cells
+        self.pools: Dict[PoolKey, deque] = {}
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failed = 0
+        self.refill_times = deque(maxlen=64)  # Timestamps of recent background generations
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.worker = None
+
+    def take(self, generator: str, rows: int, cols: int) -> List[List[int]]:
+        key = (generator, rows, cols)
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool is None and len(self.pools) < self.max_keys and rows * cols <= self.max_cells:
+                pool = self.pools[key] = deque(maxlen=self.depth)
+            maze = pool.popleft() if pool else None
+            if maze is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._ensure_worker()
+        self.wakeup.set()
+        if maze is None:
+            maze = self.generators[generator](rows, cols)
+        return maze
+
+    def _ensure_worker(self):
+        if self.worker is not None and self.worker.is_alive():
+            return
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._refill_loop, name="maze-pool", daemon=True)
+                self.worker.start()
+
+    def _next_key(self):
+        with self.lock:
+            for key, pool in self.pools.items():
+                if len(pool) < self.depth:
+                    return key
+        return None
+
+    def _refill_loop(self):
+        while True:
+            key = self._next_key()
+            if key is None:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            generator, rows, cols = key
+            try:
+                maze = self.generators[generator](rows, cols)
+            except Exception:
+                # A size the generator cannot build must not stall the other pools
+                with self.lock:
+                    self.pools.pop(key, None)
+                    self.failed += 1
+                continue
+            with self.lock:
+                pool = self.pools.get(key)
+                if pool is not None:
+                    pool.append(maze)
+                self.generated += 1
+                self.refill_times.append(time.monotonic())
+            time.sleep(self.refill_interval)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            times = list(self.refill_times)
+            pools = [
+                {"generator": g, "rows": r, "cols": c, "depth": len(pool)}
+                for (g, r, c), pool in self.pools.items()
+            ]
+            hits, misses, generated, failed = self.hits, self.misses, self.generated, self.failed
+        window = times[-1] - times[0] if len(times) > 1 else 0
+        return {
+            "pools": pools,
+            "max_depth": self.depth,
+            "hits": hits,
+            "misses": misses,
+            "generated": generated,
+            "failed": failed,
+            "refill_rate": (len(times) - 1) / window if window > 0 else 0.0
+        }
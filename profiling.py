@@ -0,0 +1,123 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Profile of the request being handled, if it asked for one
+current_profile: contextvars.ContextVar[Optional['RequestProfile']] = contextvars.ContextVar("current_profile", default=None)
+
+# cProfile and tracemalloc are process-wide, so only one request is profiled at a time
+_profiler_lock = threading.Lock()
+
+class RequestProfile:
+    """cProfile, tracemalloc and per-phase wall-clock timings for a single request"""
+    def __init__(self, path: str, top: int = 25):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.top = top
+        self.t0 = time.perf_counter()
+        self.t_end = None
+        self.phases: List[Dict[str, float]] = []
+        self.stats: Optional[pstats.Stats] = None
+        self.peak_bytes = 0
+        self.tracing = False  # True while run() has cProfile and tracemalloc active
+
+    def start(self) -> bool:
+        """Begin profiling; returns False when another request is already being profiled"""
+        return _profiler_lock.acquire(blocking=False)
+
+    def stop(self):
+        self.t_end = time.perf_counter()
+        _profiler_lock.release()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "start": start, "seconds": time.perf_counter() - start,
+                                "traced": self.tracing})
+
+    def run(self, func, *args):
+        """Run func under cProfile and tracemalloc on the calling thread.
+
+        Allocation tracing is limited to this compute part, so parse and serialize
+        timings are not slowed by it.
+        """
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        self.tracing = True
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            self.tracing = False
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.peak_bytes = max(self.peak_bytes, peak)
+            stats = pstats.Stats(profiler, stream=io.StringIO())
+            if self.stats is None:
+                self.stats = stats
+            else:
+                self.stats.add(stats)
+
+    def summary(self) -> Dict[str, Any]:
+        end = self.t_end if self.t_end is not None else time.perf_counter()
+        # Phases marked traced ran under cProfile and tracemalloc and read slower than normal
+        phases = [{"name": p["name"], "ms": p["seconds"] * 1000, "traced": p["traced"]} for p in self.phases]
+        if self.phases:
+            # Time before the first handler phase is request parsing and validation,
+            # time after the last one is response serialization
+            first = min(p["start"] for p in self.phases)
+            last = max(p["start"] + p["seconds"] for p in self.phases)
+            phases.insert(0, {"name": "parse", "ms": (first - self.t0) * 1000, "traced": False})
+            phases.append({"name": "serialize", "ms": (end - last) * 1000, "traced": False})
+
+        functions = []
+        if self.stats is not None:
+            self.stats.sort_stats(pstats.SortKey.CUMULATIVE)
+            for func in self.stats.fcn_list[:self.top]:
+                calls, primitive, tottime, cumtime, _ = self.stats.stats[func]
+                filename, line, name = func
+                functions.append({
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "tottime_ms": tottime * 1000,
+                    "cumtime_ms": cumtime * 1000
+                })
+
+        return {
+            "id": self.id,
+            "path": self.path,
+            "total_ms": (end - self.t0) * 1000,
+            "phases": phases,
+            "peak_alloc_bytes": self.peak_bytes,
+            "peak_alloc_scope": "traced phases only",
+            "top_functions": functions
+        }
+
+@contextmanager
+def profile_phase(name: str):
+    """Time a phase of the current request when it is being profiled; no-op otherwise"""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.phase(name):
+        yield
+
+# Summaries of recent profiled requests, oldest evicted first
+MAX_STORED_PROFILES = 50
+stored_profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+def store_profile(summary: Dict[str, Any]):
+    stored_profiles[summary["id"]] = summary
+    while len(stored_profiles) > MAX_STORED_PROFILES:
+        stored_profiles.popitem(last=False)
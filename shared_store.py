@@ -0,0 +1,349 @@
+import fcntl
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+from algo2 import Grid
+
+# Segment header: ready flag, then rows and cols of the stored grid (byte length and 1 for tables)
+HEADER = struct.Struct("<B3xii")
+# Host-wide index segment: pids of the workers using the store, then one entry per stored maze
+INDEX_WORKERS = 256
+WORKER = struct.Struct("<i")
+# Maze id, last use (epoch seconds), bytes of its segments (0 = free slot), comma-separated table names
+TABLE_NAMES = 48
+ENTRY = struct.Struct(f"<16sdq{TABLE_NAMES}s")
+
+def maze_id_for(luoi: List[List[int]]) -> str:
+    """Content hash of a maze, identical in every worker process"""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(struct.pack("<ii", len(luoi), len(luoi[0]) if luoi else 0))
+    for hang in luoi:
+        h.update(bytes(map(bool, hang)))  # Any non-zero cell is stored as a wall (1)
+    return h.hexdigest()
+
+class _Segment(shared_memory.SharedMemory):
+    def __del__(self):
+        # At interpreter exit grids may still view the mapping; it is unmapped with the last of them
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+def _attach(name: str, create_size: int = 0) -> Tuple[_Segment, bool]:
+    """Attach to a named segment, creating it when create_size is given; returns (segment, created)"""
+    kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+    created = False
+    shm = None
+    if create_size:
+        try:
+            shm = _Segment(name=name, create=True, size=create_size, **kwargs)
+            created = True
+        except FileExistsError:
+            pass
+    if shm is None:
+        shm = _Segment(name=name, **kwargs)
+    if sys.version_info < (3, 13):
+        # Before 3.13 the resource tracker unlinks segments when the process that opened
+        # them exits; segments here live for the host, so only unlink() removes them
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm, created
+
+class SharedGrid(Grid):
+    """
+    Read-only Grid whose rows are zero-copy memoryviews over a shared cell array.
+    shared_table(name, build) returns a table derived from this maze, shared by the host.
+    """
+    def __init__(self, soHang: int, soCot: int, cells: memoryview,
+                 shared_table: Callable[[str, Callable[[], bytes]], Optional[memoryview]]):
+        super().__init__(soHang, soCot, [cells[h * soCot:(h + 1) * soCot] for h in range(soHang)])
+        self.cells = cells
+        self.shared_table = shared_table
+
+class SharedMazeStore:
+    """
+    Mazes and tables derived from them (HPA* graph, corridor chains) in
+    multiprocessing.shared_memory, one copy per host. Segments are named after the maze
+    content hash, so any worker can attach to them. An index segment guarded by a lock file
+    tracks the stored mazes, their tables and the workers using them: past max_mazes or
+    max_bytes the least recently used maze is unlinked with its tables, and the last worker
+    to close removes every segment.
+    """
+    def __init__(self, prefix: str = "mz", max_mazes: int = 64, max_bytes: int = 64 << 20):
+        self.prefix = prefix
+        self.max_mazes = max_mazes
+        self.max_bytes = max_bytes
+        self.segments: Dict[str, _Segment] = {}  # Maze id or "<maze id>_<table>" -> segment attached by this worker
+        self.retired: List[_Segment] = []  # Detached segments that handed-out grids still view
+        self.index: Optional[_Segment] = None
+        self.lock_file = None
+        self.lock = threading.Lock()
+
+    def _name(self, key: str) -> str:
+        return f"{self.prefix}_{key}"
+
+    def _build_lock_path(self, maze_id: str) -> str:
+        return os.path.join(tempfile.gettempdir(), f"{self.prefix}_{maze_id}.build")
+
+    @contextmanager
+    def _host_lock(self):
+        if self.lock_file is None:
+            self.lock_file = open(os.path.join(tempfile.gettempdir(), f"{self.prefix}.lock"), "a")
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the worker and host locks with the index attached; yields the stored mazes"""
+        with self.lock, self._host_lock():
+            self._reap()
+            if self.index is None:
+                size = WORKER.size * INDEX_WORKERS + ENTRY.size * self.max_mazes
+                self.index, _ = _attach(self._name("index"), size)
+                self._register()
+            entries = self._entries()
+            # Drop this worker's handles on mazes and tables that another worker evicted or deleted
+            for key in list(self.segments):
+                maze_id, _, table = key.partition("_")
+                if maze_id not in entries or (table and table not in entries[maze_id][3]):
+                    self._release(self.segments.pop(key))
+            yield entries
+
+    def _slots(self) -> int:
+        return min(self.max_mazes, (self.index.size - WORKER.size * INDEX_WORKERS) // ENTRY.size)
+
+    def _entries(self) -> Dict[str, Tuple[int, float, int, List[str]]]:
+        """Maze id -> (index slot, last use, bytes, table names)"""
+        entries = {}
+        for slot in range(self._slots()):
+            maze_id, used, nbytes, tables = ENTRY.unpack_from(self.index.buf, WORKER.size * INDEX_WORKERS + slot * ENTRY.size)
+            if nbytes:
+                tables = tables.rstrip(b"\0").decode()
+                entries[maze_id.decode()] = (slot, used, nbytes, tables.split(",") if tables else [])
+        return entries
+
+    def _write_entry(self, slot: int, maze_id: str, nbytes: int, tables: List[str]):
+        ENTRY.pack_into(self.index.buf, WORKER.size * INDEX_WORKERS + slot * ENTRY.size,
+                        maze_id.encode(), time.time(), nbytes, ",".join(tables).encode())
+
+    def _touch(self, entries, maze_id: str):
+        slot, _, nbytes, tables = entries[maze_id]
+        self._write_entry(slot, maze_id, nbytes, tables)
+
+    def _make_room(self, entries, nbytes: int, slot: Optional[int] = None) -> int:
+        """Evict least recently used mazes until nbytes more fit; returns a free slot unless given one"""
+        while entries and (slot is None and len(entries) >= self._slots()
+                           or sum(e[2] for e in entries.values()) + nbytes > self.max_bytes):
+            victim = min(entries, key=lambda m: entries[m][1])
+            freed, _, _, tables = entries.pop(victim)
+            self._write_entry(freed, "", 0, [])
+            self._unlink(victim, tables)
+            slot = freed if slot is None else slot
+        if slot is None:
+            slot = min(set(range(self._slots())) - {e[0] for e in entries.values()})
+        return slot
+
+    def _register(self):
+        pid = os.getpid()
+        free = None
+        for slot in range(INDEX_WORKERS):
+            (other,) = WORKER.unpack_from(self.index.buf, slot * WORKER.size)
+            if other == pid:
+                return
+            if free is None and (other == 0 or not _alive(other)):
+                free = slot
+        if free is not None:
+            WORKER.pack_into(self.index.buf, free * WORKER.size, pid)
+
+    def _unregister(self) -> bool:
+        """Remove this worker (and any dead ones) from the index; True if no worker is left"""
+        left = False
+        for slot in range(INDEX_WORKERS):
+            (other,) = WORKER.unpack_from(self.index.buf, slot * WORKER.size)
+            if other == os.getpid() or (other and not _alive(other)):
+                WORKER.pack_into(self.index.buf, slot * WORKER.size, 0)
+            elif other:
+                left = True
+        return not left
+
+    def _segment(self, key: str) -> Optional[_Segment]:
+        shm = self.segments.get(key)
+        if shm is None:
+            try:
+                shm, _ = _attach(self._name(key))
+            except FileNotFoundError:
+                return None
+            self.segments[key] = shm
+        return shm if HEADER.unpack_from(shm.buf, 0)[0] else None
+
+    def _create(self, key: str, rows: int, cols: int, fill: Callable[[memoryview], None]) -> _Segment:
+        shm, created = _attach(self._name(key), HEADER.size + rows * cols)
+        self.segments[key] = shm
+        if created or not HEADER.unpack_from(shm.buf, 0)[0]:
+            fill(shm.buf[HEADER.size:HEADER.size + rows * cols])
+            HEADER.pack_into(shm.buf, 0, 1, rows, cols)
+        return shm
+
+    def _view(self, shm: _Segment) -> memoryview:
+        _, rows, cols = HEADER.unpack_from(shm.buf, 0)
+        return shm.buf[HEADER.size:HEADER.size + rows * cols].toreadonly()
+
+    def put(self, luoi: List[List[int]]) -> str:
+        """Store a maze once per host and return its id, evicting least recently used mazes"""
+        maze_id = maze_id_for(luoi)
+        rows, cols = len(luoi), len(luoi[0])
+        nbytes = HEADER.size + rows * cols
+        if nbytes > self.max_bytes:
+            raise ValueError(f"A {rows}x{cols} maze exceeds the shared store limit")
+        def fill(buf: memoryview):
+            for h, hang in enumerate(luoi):
+                buf[h * cols:(h + 1) * cols] = bytes(map(bool, hang))
+
+        with self._locked() as entries:
+            if maze_id in entries and self._segment(maze_id) is not None:
+                self._touch(entries, maze_id)
+                return maze_id
+            stale = entries.pop(maze_id, None)
+            if stale is not None:
+                self._unlink(maze_id, stale[3])  # Indexed but its segment is gone
+            slot = self._make_room(entries, nbytes, stale[0] if stale else None)
+            self._create(maze_id, rows, cols, fill)
+            self._write_entry(slot, maze_id, nbytes, [])
+        return maze_id
+
+    def grid(self, maze_id: str) -> Optional[SharedGrid]:
+        with self._locked() as entries:
+            shm = self._segment(maze_id) if maze_id in entries else None
+            if shm is None:
+                return None
+            self._touch(entries, maze_id)
+            _, rows, cols = HEADER.unpack_from(shm.buf, 0)
+            return SharedGrid(rows, cols, self._view(shm), partial(self.table, maze_id))
+
+    def _table_view(self, entries, maze_id: str, name: str) -> Optional[memoryview]:
+        shm = self._segment(f"{maze_id}_{name}") if name in entries[maze_id][3] else None
+        if shm is None:
+            return None
+        self._touch(entries, maze_id)
+        return self._view(shm)
+
+    def table(self, maze_id: str, name: str, build: Callable[[], bytes]) -> Optional[memoryview]:
+        """
+        A table derived from a stored maze, built by the first worker on the host that asks
+        while the others wait for it; None if the maze is not stored. A table the store has
+        no room for is handed back without being kept.
+        """
+        if not name.isalnum():
+            raise ValueError(f"Invalid table name: {name}")
+        with self._locked() as entries:
+            if maze_id not in entries:
+                return None
+            view = self._table_view(entries, maze_id, name)
+        if view is not None:
+            return view
+        with open(self._build_lock_path(maze_id), "a") as build_lock:
+            fcntl.flock(build_lock, fcntl.LOCK_EX)  # Released when the file is closed
+            with self._locked() as entries:
+                if maze_id not in entries:
+                    return None
+                view = self._table_view(entries, maze_id, name)
+            if view is not None:
+                return view
+            data = build()
+            with self._locked() as entries:
+                entry = entries.pop(maze_id, None)
+                if entry is None:
+                    return memoryview(data)  # Evicted while building
+                slot, _, nbytes, tables = entry
+                tables = tables + [name]
+                nbytes += HEADER.size + len(data)
+                if nbytes > self.max_bytes or len(",".join(tables)) > TABLE_NAMES:
+                    return memoryview(data)
+                self._make_room(entries, nbytes, slot)
+
+                def fill(buf: memoryview):
+                    buf[:] = data
+
+                shm = self._create(f"{maze_id}_{name}", len(data), 1, fill)
+                self._write_entry(slot, maze_id, nbytes, tables)
+                return self._view(shm)
+
+    def unlink(self, maze_id: str):
+        """Remove a stored maze and its tables from the host"""
+        with self._locked() as entries:
+            if maze_id in entries:
+                self._write_entry(entries[maze_id][0], "", 0, [])
+                self._unlink(maze_id, entries[maze_id][3])
+
+    def close(self):
+        """Detach this worker; the last worker using the store removes every maze from the host"""
+        with self.lock:
+            if self.index is not None:
+                with self._host_lock():
+                    if self._unregister():
+                        for maze_id, entry in self._entries().items():
+                            self._unlink(maze_id, entry[3])
+                        self._unlink_segment(self._name("index"), self.index)
+                    else:
+                        self._release(self.index)
+                self.index = None
+            for shm in self.segments.values():
+                self._release(shm)
+            self.segments.clear()
+
+    def _unlink(self, maze_id: str, tables: List[str]):
+        for key in [maze_id] + [f"{maze_id}_{name}" for name in tables]:
+            self._unlink_segment(self._name(key), self.segments.pop(key, None))
+        try:
+            os.unlink(self._build_lock_path(maze_id))
+        except FileNotFoundError:
+            pass
+
+    def _unlink_segment(self, name: str, shm: Optional[_Segment]):
+        if shm is None:
+            try:
+                shm, _ = _attach(name)
+            except FileNotFoundError:
+                return
+        if sys.version_info < (3, 13):
+            resource_tracker.register(shm._name, "shared_memory")  # unlink() unregisters it
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            if sys.version_info < (3, 13):
+                resource_tracker.unregister(shm._name, "shared_memory")
+        self._release(shm)
+
+    def _release(self, shm: _Segment):
+        """Close a detached segment now, or keep it until the grids viewing it are gone"""
+        if not _try_close(shm):
+            self.retired.append(shm)
+
+    def _reap(self):
+        self.retired = [shm for shm in self.retired if not _try_close(shm)]
+
+def _try_close(shm: _Segment) -> bool:
+    try:
+        shm.close()
+    except BufferError:
+        return False
+    return True
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True